@@ -2,58 +2,342 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 import sys
 import os
+import io
 import json
+import base64
+import builtins
+import hashlib
+import importlib.util
+import marshal
+import multiprocessing
+import threading
 import traceback
+from contextlib import redirect_stdout, redirect_stderr
+from functools import lru_cache
+
+import numpy as np
+import orjson
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
 
 # Add the qiskit directory to the path
-sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'qiskit'))
+QISKIT_DIR = os.path.join(os.path.dirname(__file__), '..', 'qiskit')
+sys.path.append(QISKIT_DIR)
 
 from main import bb84_protocol, analyze_results
-from e91_protocol import e91_protocol, analyze_e91_results
+from e91_protocol import e91_protocol
 from b92_protocol import b92_protocol, analyze_b92_results
 
+
+def load_qiskit_module(name, filename):
+    """Import a module from the qiskit directory by file path, so a same-named backend module cannot shadow it"""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(QISKIT_DIR, filename))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+# The import above finds backend/e91_protocol.py (used by /api/e91) first;
+# /api/e91/simulate needs the noise-aware protocol from the qiskit directory
+qiskit_e91 = load_qiskit_module('qiskit_e91_protocol', 'e91_protocol.py')
+
+# Render user plots off-screen; also spares pyplot from probing GUI toolkits on import
+os.environ.setdefault('MPLBACKEND', 'Agg')
+
+
+class LazyPyplot:
+    """Stand-in for matplotlib.pyplot that imports it the first time user code touches it"""
+
+    def __getattr__(self, name):
+        import matplotlib.pyplot as plt
+        return getattr(plt, name)
+
+
+# Libraries exposed to user code in /api/execute-python, imported once at startup
+# (pyplot excepted: most scripts never plot, so it loads on first use)
+try:
+    plt = LazyPyplot()
+    from qiskit import QuantumCircuit, transpile
+    from qiskit.visualization import plot_histogram
+    from qiskit_aer import AerSimulator
+    EXEC_IMPORTS = {
+        'numpy': np,
+        'np': np,
+        'matplotlib': plt,
+        'plt': plt,
+        'QuantumCircuit': QuantumCircuit,
+        'transpile': transpile,
+        'plot_histogram': plot_histogram,
+        'AerSimulator': AerSimulator
+    }
+    EXEC_IMPORT_ERROR = None
+except ImportError as e:
+    EXEC_IMPORTS = {}
+    EXEC_IMPORT_ERROR = str(e)
+
+
 app = Flask(__name__)
-CORS(app)  # Enable CORS for all routes
+# Responses built with jsonify (errors, health) need not pay for key sorting;
+# anything carrying NumPy data goes through ojsonify
+app.json.sort_keys = False
+# Enable CORS (all origins unless CORS_ORIGINS is set); max_age lets browsers
+# cache the preflight instead of sending an OPTIONS round trip before every POST
+CORS(app, origins=os.environ.get('CORS_ORIGINS', '*').split(','), max_age=86400, expose_headers=['ETag'])
+
+
+def ojsonify(obj, status=200):
+    """Serialize a response with orjson, which encodes NumPy arrays and scalars natively"""
+    return app.response_class(
+        orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+        status=status,
+        mimetype='application/json'
+    )
+
+
+# Bit-valued response fields that can be sent packed with ?format=packed
+BIT_ARRAY_FIELDS = ('alice_bits', 'alice_bases', 'bob_bases', 'bob_results', 'alice_key', 'bob_key')
+
+
+def pack_bits(bits):
+    """Pack a sequence of 0/1 values into base64 (8 bits per byte) plus its length"""
+    bits = np.asarray(bits, dtype=np.uint8)
+    return {
+        'packed': base64.b64encode(np.packbits(bits)).decode('ascii'),
+        'length': int(bits.size)
+    }
+
+
+def pack_bit_arrays(data):
+    """Replace the bit arrays in a response payload with their packed form"""
+    for field in BIT_ARRAY_FIELDS:
+        data[field] = pack_bits(data[field])
+
+
+@lru_cache(maxsize=256)
+def compile_user_code(code):
+    """
+    Compile /api/execute-python code to marshalled bytecode. Compiled in the
+    server process and cached there, so repeat submissions skip parsing and
+    each run's process only unmarshals.
+    """
+    return marshal.dumps(compile(code, '<user>', 'exec'))
+
+
+# Top-level packages user code may import; everything else (os, subprocess, ...) is refused.
+# This keeps scripts to the libraries the page documents; it is not a security
+# boundary (see SAFE_BUILTINS).
+ALLOWED_IMPORTS = frozenset({
+    'numpy', 'matplotlib', 'qiskit', 'qiskit_aer', 'math', 'cmath', 'random',
+    'statistics', 'itertools', 'functools', 'collections', 'fractions', 'decimal'
+})
+
+
+def safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    """__import__ replacement that only admits ALLOWED_IMPORTS"""
+    if level != 0 or name.partition('.')[0] not in ALLOWED_IMPORTS:
+        raise ImportError(f"Import of '{name}' is not allowed")
+    return builtins.__import__(name, globals, locals, fromlist, level)
+
+
+# Builtins visible to user code: the everyday ones, minus open/input/exec/eval/compile.
+# A small dict keeps builtin lookups cheap, but it does not sandbox anything, since
+# every imported module still reaches the full builtins. Isolation comes from each run's
+# own process, its memory limit and its timeout.
+SAFE_BUILTINS = {name: getattr(builtins, name) for name in (
+    'abs', 'all', 'any', 'ascii', 'bin', 'bool', 'bytearray', 'bytes', 'callable', 'chr',
+    'complex', 'delattr', 'dict', 'dir', 'divmod', 'enumerate', 'filter', 'float', 'format',
+    'frozenset', 'getattr', 'globals', 'hasattr', 'hash', 'hex', 'id', 'int', 'isinstance',
+    'issubclass', 'iter', 'len', 'list', 'locals', 'map', 'max', 'memoryview', 'min', 'next',
+    'object', 'oct', 'ord', 'pow', 'print', 'range', 'repr', 'reversed', 'round',
+    'set', 'setattr', 'slice', 'sorted', 'str', 'sum', 'tuple', 'type', 'vars', 'zip',
+    'staticmethod', 'classmethod', 'property', 'super', '__build_class__',
+    'BaseException', 'Exception', 'ArithmeticError', 'AssertionError', 'AttributeError',
+    'FloatingPointError', 'ImportError', 'IndexError', 'KeyError', 'LookupError',
+    'ModuleNotFoundError', 'NameError', 'NotImplementedError', 'OverflowError',
+    'RecursionError', 'RuntimeError', 'StopIteration', 'TypeError',
+    'UnboundLocalError', 'ValueError', 'ZeroDivisionError', 'Warning', 'UserWarning',
+    'DeprecationWarning', 'RuntimeWarning',
+    'True', 'False', 'None', 'NotImplemented', 'Ellipsis'
+)}
+SAFE_BUILTINS['__import__'] = safe_import
+
+# Globals every user script starts from; each run gets a shallow copy
+EXEC_GLOBALS = {'__builtins__': SAFE_BUILTINS, '__name__': '__main__', **EXEC_IMPORTS}
+
+
+# Characters of stdout/stderr kept per /api/execute-python run; the rest is dropped
+MAX_OUTPUT_CHARS = 100_000
+
+
+class BoundedOutput(io.StringIO):
+    """StringIO that keeps at most MAX_OUTPUT_CHARS, so a print loop cannot exhaust memory"""
+
+    truncated = False
+
+    def write(self, text):
+        room = MAX_OUTPUT_CHARS - self.tell()
+        if len(text) > room:
+            self.truncated = True
+            text = text[:max(room, 0)]
+        return super().write(text)
+
+    def getvalue(self):
+        value = super().getvalue()
+        if self.truncated:
+            value += f'\n[output truncated after {MAX_OUTPUT_CHARS} characters]\n'
+        return value
+
+
+def run_user_code(code_bytes):
+    """
+    Execute user code and capture what it prints. Runs inside the run's own process.
+    
+    Args:
+        code_bytes: Marshalled code object from compile_user_code
+    
+    Returns:
+        Tuple of (stdout output, stderr output, exception message or None)
+    """
+    # Capture output
+    output_buffer = BoundedOutput()
+    error_buffer = BoundedOutput()
+    
+    # Prepare execution environment
+    exec_globals = dict(EXEC_GLOBALS)
+    exec_globals['print'] = lambda *args, **kwargs: print(*args, file=output_buffer, **kwargs)
+    
+    try:
+        with redirect_stdout(output_buffer), redirect_stderr(error_buffer):
+            exec(marshal.loads(code_bytes), exec_globals)
+    except Exception as e:
+        return output_buffer.getvalue(), error_buffer.getvalue(), str(e)
+    
+    return output_buffer.getvalue(), error_buffer.getvalue(), None
+
+
+# Seconds a /api/execute-python submission may run before the request gives up
+EXECUTION_TIMEOUT = 30
+# Address-space cap per run; an idle process with numpy and qiskit loaded maps ~1.5 GB
+EXECUTION_MEMORY_LIMIT = int(os.environ.get('EXECUTION_MEMORY_LIMIT_MB', 2048)) * 2**20
+# Concurrent runs per server process; by default the server processes share the cores
+EXECUTION_WORKERS = int(os.environ.get(
+    'EXECUTION_WORKERS',
+    max(1, (os.cpu_count() or 1) // int(os.environ.get('WEB_CONCURRENCY', os.cpu_count() or 1)))
+))
+EXECUTION_SLOTS = threading.BoundedSemaphore(EXECUTION_WORKERS)
+# Seconds a submission may wait for a free slot before the request is turned away
+EXECUTION_QUEUE_TIMEOUT = int(os.environ.get('EXECUTION_QUEUE_TIMEOUT', 10))
+
+
+class ExecutionBusyError(Exception):
+    """Every execution slot stayed taken for EXECUTION_QUEUE_TIMEOUT seconds"""
+
+# Runs start from a forkserver rather than a fork of this multi-threaded process,
+# which could copy locks held by other threads. The forkserver preloads this
+# module (importable because the server runs from backend/), so each run still
+# starts with numpy and qiskit already imported.
+if 'forkserver' in multiprocessing.get_all_start_methods():
+    EXEC_CONTEXT = multiprocessing.get_context('forkserver')
+    EXEC_CONTEXT.set_forkserver_preload([__name__])
+else:  # Windows
+    EXEC_CONTEXT = multiprocessing.get_context('spawn')
+
+
+def limit_worker_resources():
+    """Cap the run's memory so one script cannot exhaust the host"""
+    if resource is None:
+        return
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(EXECUTION_MEMORY_LIMIT, hard)
+    else:
+        limit = EXECUTION_MEMORY_LIMIT
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def user_code_process(code_bytes, conn):
+    """Process target for one /api/execute-python run: send run_user_code's result back over conn"""
+    limit_worker_resources()
+    conn.send(run_user_code(code_bytes))
+    conn.close()
+
+
+def execute_user_code(code_bytes, timeout):
+    """
+    Run user code in a process of its own, so a runaway script can be killed
+    without touching any other request's run. At most EXECUTION_WORKERS runs
+    go at once; further requests wait up to EXECUTION_QUEUE_TIMEOUT seconds
+    for a slot.
+    
+    Args:
+        code_bytes: Marshalled code object from compile_user_code
+        timeout: Seconds to wait for the result
+    
+    Returns:
+        Tuple of (stdout output, stderr output, exception message or None)
+    
+    Raises:
+        ExecutionBusyError: No slot freed up in time; the code did not run
+        TimeoutError: The run did not finish in time (its process has been killed)
+        ChildProcessError: The process died without sending a result
+    """
+    if not EXECUTION_SLOTS.acquire(timeout=EXECUTION_QUEUE_TIMEOUT):
+        raise ExecutionBusyError
+    try:
+        receiver, sender = EXEC_CONTEXT.Pipe(duplex=False)
+        process = EXEC_CONTEXT.Process(target=user_code_process, args=(code_bytes, sender), daemon=True)
+        process.start()
+        sender.close()
+        try:
+            if not receiver.poll(timeout):
+                raise TimeoutError
+            return receiver.recv()
+        except EOFError:
+            raise ChildProcessError from None
+        finally:
+            receiver.close()
+            process.terminate()
+            process.join()
+    finally:
+        EXECUTION_SLOTS.release()
+
 
 @app.route('/api/bb84', methods=['POST'])
 def run_bb84():
     try:
         # Get parameters from request
-        data = request.get_json() or {}
+        data = request.get_json(silent=True, force=True, cache=False) or {}
         n_bits = data.get('n_bits', 4)
         seed = data.get('seed', 0)
         
         # Run BB84 protocol
         results = bb84_protocol(n_bits=n_bits, seed=seed)
         
-        # Calculate QBER
-        alice_key = results['alice_key']
-        bob_key = results['bob_key']
-        
-        if alice_key and bob_key:
-            errors = sum(a != b for a, b in zip(alice_key, bob_key))
-            qber = errors / len(alice_key) if alice_key else 0
-        else:
-            qber = 0
-        
-        # Prepare response - convert all numpy types to Python native types
+        # Prepare response - orjson serializes numpy arrays and scalars directly
         response = {
             'success': True,
             'data': {
-                'alice_bits': [int(x) for x in results['alice_bits'].tolist()],
-                'alice_bases': [int(x) for x in results['alice_bases'].tolist()],
-                'bob_bases': [int(x) for x in results['bob_bases'].tolist()],
-                'bob_results': [int(x) for x in results['bob_results']],
-                'alice_key': [int(x) for x in alice_key],
-                'bob_key': [int(x) for x in bob_key],
-                'qber': float(qber),
+                'alice_bits': results['alice_bits'],
+                'alice_bases': results['alice_bases'],
+                'bob_bases': results['bob_bases'],
+                'bob_results': results['bob_results'],
+                'alice_key': results['alice_key'],
+                'bob_key': results['bob_key'],
+                'qber': results['qber'],
                 'job_id': str(results['job_id']),
-                'key_length': int(len(alice_key)),
-                'keys_match': bool(alice_key == bob_key)
+                'key_length': results['alice_key'].size,
+                'keys_match': results['keys_match']
             }
         }
         
-        return jsonify(response)
+        if request.args.get('format') == 'packed':
+            pack_bit_arrays(response['data'])
+        
+        return ojsonify(response)
         
     except Exception as e:
         return jsonify({
@@ -62,99 +346,323 @@ def run_bb84():
             'traceback': traceback.format_exc()
         }), 500
 
+def parse_optical_noise(data):
+    """Read the optional optical noise parameters from a request payload"""
+    optical_noise = data.get('optical_noise', {})
+    return (
+        optical_noise.get('depolarization', 0.01),
+        optical_noise.get('phase_damping', 0.01),
+        optical_noise.get('amplitude_damping', 0.05),
+        optical_noise.get('fiber_length', 10),
+        optical_noise.get('attenuation_coeff', 0.20),
+    )
+
+
+@lru_cache(maxsize=128)
+def photon_loss(attenuation_coeff, fiber_length, amplitude_damping):
+    """Return (fiber photon loss probability, combined amplitude damping)"""
+    # Calculate photon loss from fiber attenuation (Beer-Lambert law)
+    photon_loss_prob = 1 - (10 ** (-(attenuation_coeff * fiber_length) / 10))
+    return photon_loss_prob, min(amplitude_damping + photon_loss_prob, 1.0)
+
+
+def draw_bb84_samples(rng, n_bits):
+    """Draw all random inputs of one simulated BB84 run"""
+    alice_bits = rng.integers(0, 2, size=n_bits, dtype=np.uint8)
+    alice_bases = rng.integers(0, 2, size=n_bits, dtype=np.uint8)
+    bob_bases = rng.integers(0, 2, size=n_bits, dtype=np.uint8)
+    # One float32 block for the loss, depolarization and phase damping stages
+    noise = rng.random((3, n_bits), dtype=np.float32)
+    return {
+        'alice_bits': alice_bits,
+        'alice_bases': alice_bases,
+        'bob_bases': bob_bases,
+        'loss': noise[0],
+        'depolarization': noise[1],
+        'phase_damping': noise[2],
+        'random_bits': rng.integers(0, 2, size=n_bits, dtype=np.uint8),
+    }
+
+
+def apply_bb84_channel(samples, combined_amplitude_damping, depolarization, phase_damping):
+    """
+    Send Alice's photons through the noisy channel and measure them in Bob's bases
+
+    Works elementwise, so samples may hold a single run or a stack of runs.
+    Returns (detected_mask, bob_measured, keep) where keep marks the sifted positions.
+    """
+    alice_bits = samples['alice_bits']
+    alice_bases = samples['alice_bases']
+
+    # Apply amplitude damping (photon loss)
+    detected_mask = samples['loss'] >= combined_amplitude_damping
+
+    # Apply depolarization (polarization flip)
+    depolarized = samples['depolarization'] < depolarization
+
+    # Apply phase damping (for superposition states - affects diagonal basis)
+    # Phase errors manifest as bit flips in diagonal basis
+    phase_flipped = (alice_bases == 1) & (samples['phase_damping'] < phase_damping)
+
+    bit_values = alice_bits ^ depolarized ^ phase_flipped
+
+    # Bob measures: same basis keeps the (noisy) bit, a different basis
+    # gives a random result due to quantum measurement in wrong basis
+    same_basis = alice_bases == samples['bob_bases']
+    bob_measured = np.where(same_basis, bit_values, samples['random_bits'])
+
+    # Sifted keys come only from detected photons with matching bases
+    return detected_mask, bob_measured, detected_mask & same_basis
+
+
+def simulate_bb84_data(n_bits, seed, depolarization, phase_damping, amplitude_damping,
+                       fiber_length, attenuation_coeff):
+    """Simulate a BB84 exchange over a noisy optical channel and return the response data"""
+    photon_loss_prob, combined_amplitude_damping = photon_loss(
+        attenuation_coeff, fiber_length, amplitude_damping
+    )
+    
+    samples = draw_bb84_samples(np.random.default_rng(seed), n_bits)
+    detected_mask, bob_measured, keep = apply_bb84_channel(
+        samples, combined_amplitude_damping, depolarization, phase_damping
+    )
+    
+    alice_bits = samples['alice_bits']
+    bob_results = bob_measured[detected_mask]  # Lost photons give no result
+    
+    # Generate sifted keys
+    alice_key = alice_bits[keep]
+    bob_key = bob_measured[keep]
+    
+    # Calculate QBER
+    errors = int(np.count_nonzero(alice_key != bob_key))
+    qber = errors / alice_key.size if alice_key.size else 0.0
+    
+    return {
+        'alice_bits': alice_bits,
+        'alice_bases': samples['alice_bases'],
+        'bob_bases': samples['bob_bases'],
+        'bob_results': bob_results,
+        'alice_key': alice_key,
+        'bob_key': bob_key,
+        'qber': qber,
+        'job_id': f'sim_{seed}_{n_bits}',
+        'key_length': len(alice_key),
+        'keys_match': errors == 0,
+        'photon_loss_rate': photon_loss_prob,
+        'detected_photons': bob_results.size
+    }
+
+
+# Simulated runs are fully determined by their parameters, so small ones are
+# cached as serialized responses and repeat requests skip the simulation
+SIMULATION_CACHE_MAX_BITS = 10_000
+
+
+def cached_response(build, n, seed, *params):
+    """Call an lru_cached response builder, bypassing its cache for unseeded or oversized runs"""
+    if seed is None or n > SIMULATION_CACHE_MAX_BITS:
+        return build.__wrapped__(n, seed, *params)
+    return build(n, seed, *params)
+
+
+# Version of each cached response builder's seeded output. Bump an entry whenever
+# a seed starts producing different results (new sampling, dtypes or response
+# fields), so ETags handed out by an earlier deploy stop matching and clients
+# refetch instead of getting a 304.
+RESPONSE_VERSIONS = {
+    'simulate_bb84_response': 1,
+    'e91_response': 1,
+    'simulate_e91_response': 1,
+    'simulate_b92_response': 1,
+}
+
+
+def params_etag(build, *params):
+    """ETag for a response from build that is fully determined by its request parameters"""
+    key = (build.__name__, RESPONSE_VERSIONS[build.__name__], params)
+    return hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+
+
+@lru_cache(maxsize=512)
+def simulate_bb84_response(n_bits, seed, depolarization, phase_damping, amplitude_damping,
+                           fiber_length, attenuation_coeff, packed):
+    """Simulate a BB84 exchange and return the serialized JSON response body"""
+    data = simulate_bb84_data(n_bits, seed, depolarization, phase_damping, amplitude_damping,
+                              fiber_length, attenuation_coeff)
+    if packed:
+        pack_bit_arrays(data)
+    return orjson.dumps({'success': True, 'data': data}, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def protocol_response(build, n, seed, *params):
+    """
+    Respond with the body from an lru_cached response builder. Seeded runs are
+    deterministic, so they carry an ETag and a client that already holds the
+    result gets a bodyless 304.
+    """
+    if seed is None:
+        return app.response_class(cached_response(build, n, seed, *params), mimetype='application/json')
+    
+    etag = params_etag(build, n, seed, *params)
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        response = app.response_class(cached_response(build, n, seed, *params), mimetype='application/json')
+    response.set_etag(etag)
+    return response
+
+
+def stream_response(data):
+    """Yield a {'success': True, 'data': data} body one field at a time, so large arrays
+    are never joined into a single buffer"""
+    yield b'{"success":true,"data":{'
+    for i, (key, value) in enumerate(data.items()):
+        yield (b',' if i else b'') + orjson.dumps(key) + b':'
+        yield orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    yield b'}}'
+
+
 @app.route('/api/bb84/simulate', methods=['POST'])
 def simulate_bb84():
     """Run BB84 simulation without real quantum hardware, with optical noise support"""
     try:
-        data = request.get_json() or {}
+        data = request.get_json(silent=True, force=True, cache=False) or {}
         n_bits = data.get('n_bits', 4)
         seed = data.get('seed', 0)
         
         # Optical noise parameters (optional)
-        optical_noise = data.get('optical_noise', {})
-        depolarization = optical_noise.get('depolarization', 0.01)
-        phase_damping = optical_noise.get('phase_damping', 0.01)
-        amplitude_damping = optical_noise.get('amplitude_damping', 0.05)
-        fiber_length = optical_noise.get('fiber_length', 10)
-        attenuation_coeff = optical_noise.get('attenuation_coeff', 0.20)
-        
-        # Import numpy for simulation
-        import numpy as np
-        np.random.seed(seed)
-        
-        # Calculate photon loss from fiber attenuation (Beer-Lambert law)
-        photon_loss_prob = 1 - (10 ** (-(attenuation_coeff * fiber_length) / 10))
-        combined_amplitude_damping = min(amplitude_damping + photon_loss_prob, 1.0)
-        
-        # Generate random data
-        alice_bits = np.random.randint(2, size=n_bits)
-        alice_bases = np.random.randint(2, size=n_bits)
-        bob_bases = np.random.randint(2, size=n_bits)
-        
-        # Simulate Bob's measurements with optical noise
-        bob_results = []
-        detected_indices = []  # Track which photons were detected (not lost)
-        
-        for i in range(n_bits):
-            # Apply amplitude damping (photon loss)
-            if np.random.random() < combined_amplitude_damping:
-                # Photon lost - skip this bit
-                continue
-            
-            detected_indices.append(i)
-            bit_value = alice_bits[i]
-            
-            # Apply depolarization (polarization flip)
-            if np.random.random() < depolarization:
-                bit_value = 1 - bit_value
-            
-            # Apply phase damping (for superposition states - affects diagonal basis)
-            if alice_bases[i] == 1 and np.random.random() < phase_damping:
-                # Phase errors manifest as bit flips in diagonal basis
-                bit_value = 1 - bit_value
-            
-            # Bob measures
-            if alice_bases[i] == bob_bases[i]:  # Same basis
-                # With optical noise, there's still a small chance of error
-                bob_results.append(int(bit_value))
-            else:  # Different basis
-                # Random result due to quantum measurement in wrong basis
-                bob_results.append(int(np.random.randint(2)))
-        
-        # Generate sifted keys (only from detected photons with matching bases)
-        alice_key = [int(alice_bits[detected_indices[j]]) 
-                     for j in range(len(detected_indices)) 
-                     if alice_bases[detected_indices[j]] == bob_bases[detected_indices[j]]]
-        bob_key = [int(bob_results[j]) 
-                   for j in range(len(detected_indices)) 
-                   if alice_bases[detected_indices[j]] == bob_bases[detected_indices[j]]]
-        
-        # Calculate QBER
-        if alice_key and bob_key:
-            errors = sum(a != b for a, b in zip(alice_key, bob_key))
-            qber = errors / len(alice_key) if alice_key else 0
+        params = (n_bits, seed, *parse_optical_noise(data), request.args.get('format') == 'packed')
+        
+        # Seeded runs are deterministic, so a client that already holds this
+        # exact result gets a bodyless 304 without the simulation running again
+        etag = params_etag(simulate_bb84_response, *params) if seed is not None else None
+        if etag is not None and request.if_none_match.contains(etag):
+            response = app.response_class(status=304)
+            response.set_etag(etag)
+            return response
+        
+        if n_bits <= SIMULATION_CACHE_MAX_BITS:
+            # Unseeded runs must draw fresh randomness, so they skip the cache
+            body = cached_response(simulate_bb84_response, *params)
         else:
-            qber = 0
+            # Too large to cache: simulate now (so failures still return a 500),
+            # then stream the body out chunked as each field is encoded
+            *simulation_params, packed = params
+            result = simulate_bb84_data(*simulation_params)
+            if packed:
+                pack_bit_arrays(result)
+            body = stream_response(result)
+        
+        response = app.response_class(body, mimetype='application/json')
+        if etag is not None:
+            response.set_etag(etag)
+        return response
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'traceback': traceback.format_exc()
+        }), 500
+
+# Most runs (seeds or trials) one /api/bb84/simulate_batch request may ask for
+MAX_TRIALS = 1000
+
+
+def summarize_bb84_run(n_bits, seed, depolarization, phase_damping, amplitude_damping,
+                       fiber_length, attenuation_coeff):
+    """Simulate one BB84 trial and return only its summary statistics"""
+    data = simulate_bb84_data(n_bits, seed, depolarization, phase_damping, amplitude_damping,
+                              fiber_length, attenuation_coeff)
+    return {
+        'n_bits': n_bits,
+        'seed': seed,
+        'qber': data['qber'],
+        'key_length': data['key_length'],
+        'detected_photons': data['detected_photons'],
+        'photon_loss_rate': data['photon_loss_rate']
+    }
+
+
+@app.route('/api/bb84/simulate_batch', methods=['POST'])
+def simulate_bb84_batch():
+    """
+    Run many BB84 simulations for QBER sweeps: one per seed in a single vectorized
+    pass, or one per entry of 'trials' (each with its own parameters)
+    """
+    try:
+        data = request.get_json(silent=True, force=True, cache=False) or {}
+        n_bits = data.get('n_bits', 4)
+        
+        # Trials with their own parameters cannot share one array pass, so each
+        # runs on its own. They stay in this process: a trial is a few vectorized
+        # NumPy calls, cheaper than pickling it to and from a worker.
+        trials = data.get('trials')
+        if trials is not None:
+            if not trials:
+                return jsonify({
+                    'success': False,
+                    'error': 'No trials provided'
+                })
+            if len(trials) > MAX_TRIALS:
+                return jsonify({
+                    'success': False,
+                    'error': f'At most {MAX_TRIALS} trials per request'
+                })
+            results = [
+                summarize_bb84_run(trial.get('n_bits', n_bits), trial.get('seed', 0),
+                                   *parse_optical_noise(trial if 'optical_noise' in trial else data))
+                for trial in trials
+            ]
+            return ojsonify({'success': True, 'data': {'trials': results}})
+        
+        seeds = data.get('seeds', [0])
+        
+        if not seeds:
+            return jsonify({
+                'success': False,
+                'error': 'No seeds provided'
+            })
+        if len(seeds) > MAX_TRIALS:
+            return jsonify({
+                'success': False,
+                'error': f'At most {MAX_TRIALS} seeds per request'
+            })
+        
+        depolarization, phase_damping, amplitude_damping, fiber_length, attenuation_coeff = \
+            parse_optical_noise(data)
+        
+        photon_loss_prob, combined_amplitude_damping = photon_loss(
+            attenuation_coeff, fiber_length, amplitude_damping
+        )
+        
+        # Each row is drawn from its own seed, so it matches /api/bb84/simulate for that seed
+        runs = [draw_bb84_samples(np.random.default_rng(seed), n_bits) for seed in seeds]
+        samples = {name: np.stack([run[name] for run in runs]) for name in runs[0]}
+        
+        # Apply the channel to all (n_trials, n_bits) samples at once
+        detected_mask, bob_measured, keep = apply_bb84_channel(
+            samples, combined_amplitude_damping, depolarization, phase_damping
+        )
+        
+        errors = np.count_nonzero(keep & (samples['alice_bits'] != bob_measured), axis=1)
+        key_lengths = np.count_nonzero(keep, axis=1)
+        qber = np.divide(errors, key_lengths, out=np.zeros(len(seeds)), where=key_lengths > 0)
         
         response = {
             'success': True,
             'data': {
-                'alice_bits': [int(x) for x in alice_bits.tolist()],
-                'alice_bases': [int(x) for x in alice_bases.tolist()],
-                'bob_bases': [int(x) for x in bob_bases.tolist()],
-                'bob_results': [int(x) for x in bob_results],
-                'alice_key': [int(x) for x in alice_key],
-                'bob_key': [int(x) for x in bob_key],
-                'qber': float(qber),
-                'job_id': f'sim_{seed}_{n_bits}',
-                'key_length': int(len(alice_key)),
-                'keys_match': bool(alice_key == bob_key),
-                'photon_loss_rate': float(photon_loss_prob),
-                'detected_photons': len(detected_indices)
+                'n_bits': n_bits,
+                'seeds': seeds,
+                'qber': qber,
+                'key_length': key_lengths,
+                'detected_photons': np.count_nonzero(detected_mask, axis=1),
+                'photon_loss_rate': photon_loss_prob
             }
         }
         
-        return jsonify(response)
+        return ojsonify(response)
         
     except Exception as e:
         return jsonify({
@@ -166,7 +674,7 @@ def simulate_bb84():
 @app.route('/api/execute-python', methods=['POST'])
 def execute_python():
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True, force=True, cache=False) or {}
         code = data.get('code', '')
         
         if not code.strip():
@@ -175,63 +683,51 @@ def execute_python():
                 'error': 'No code provided'
             })
         
-        # Create a safe execution environment
-        import io
-        import sys
-        from contextlib import redirect_stdout, redirect_stderr
-        
-        # Capture output
-        output_buffer = io.StringIO()
-        error_buffer = io.StringIO()
-        
-        # Prepare execution environment
-        exec_globals = {
-            '__builtins__': __builtins__,
-            'print': lambda *args, **kwargs: print(*args, file=output_buffer, **kwargs),
-        }
+        if EXEC_IMPORT_ERROR:
+            return jsonify({
+                'success': False,
+                'error': f'Required library not available: {EXEC_IMPORT_ERROR}'
+            })
         
-        # Add common imports
         try:
-            import numpy as np
-            import matplotlib.pyplot as plt
-            from qiskit import QuantumCircuit, transpile
-            from qiskit.visualization import plot_histogram
-            from qiskit_aer import AerSimulator
-            exec_globals.update({
-                'numpy': np,
-                'np': np,
-                'matplotlib': plt,
-                'plt': plt,
-                'QuantumCircuit': QuantumCircuit,
-                'transpile': transpile,
-                'plot_histogram': plot_histogram,
-                'AerSimulator': AerSimulator
-            })
-        except ImportError as e:
+            code_bytes = compile_user_code(code)
+        except (SyntaxError, ValueError) as e:
             return jsonify({
                 'success': False,
-                'error': f'Required library not available: {str(e)}'
+                'error': f'Execution error: {str(e)}'
             })
         
+        # Run in a separate process so user code neither holds this process's GIL
+        # nor takes the server down if it crashes or never returns
         try:
-            # Execute the code
-            with redirect_stdout(output_buffer), redirect_stderr(error_buffer):
-                exec(code, exec_globals)
-            
-            output = output_buffer.getvalue()
-            error = error_buffer.getvalue()
-            
+            output, error, exception = execute_user_code(code_bytes, EXECUTION_TIMEOUT)
+        except ExecutionBusyError:
             return jsonify({
-                'success': True,
-                'output': output,
-                'error': error if error else None
+                'success': False,
+                'error': 'Server busy: too many scripts running, try again shortly'
+            }), 503
+        except TimeoutError:
+            return jsonify({
+                'success': False,
+                'error': f'Execution timed out after {EXECUTION_TIMEOUT} seconds'
+            }), 504
+        except ChildProcessError:
+            return jsonify({
+                'success': False,
+                'error': 'Execution error: worker process terminated unexpectedly'
             })
-            
-        except Exception as e:
+        
+        if exception is not None:
             return jsonify({
                 'success': False,
-                'error': f'Execution error: {str(e)}'
+                'error': f'Execution error: {exception}'
             })
+        
+        return jsonify({
+            'success': True,
+            'output': output,
+            'error': error if error else None
+        })
             
     except Exception as e:
         return jsonify({
@@ -239,38 +735,42 @@ def execute_python():
             'error': f'Server error: {str(e)}'
         }), 500
 
+@lru_cache(maxsize=256)
+def e91_response(n_pairs, seed):
+    """Run the E91 protocol and return the serialized JSON response body"""
+    results = e91_protocol(n_pairs=n_pairs, seed=seed)
+
+    # orjson serializes numpy arrays and scalars directly
+    return orjson.dumps({
+        'success': True,
+        'data': {
+            'n_pairs': results['n_pairs'],
+            'alice_bases': results['alice_bases'],
+            'bob_bases': results['bob_bases'],
+            'alice_outcomes': results['alice_outcomes'],
+            'bob_outcomes': results['bob_outcomes'],
+            'alice_sifted_key': results['alice_sifted_key'],
+            'bob_sifted_key': results['bob_sifted_key'],
+            'bob_corrected_key': results['bob_corrected_key'],
+            'qber': results['qber'],
+            'chsh_value': results['chsh_value'],
+            'bell_violated': results['bell_violated'],
+            'key_length': len(results['alice_sifted_key']),
+            'keys_match': np.array_equal(results['alice_sifted_key'], results['bob_corrected_key'])
+        }
+    }, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
 @app.route('/api/e91', methods=['POST'])
 def run_e91():
     try:
         # Get parameters from request
-        data = request.get_json() or {}
+        data = request.get_json(silent=True, force=True, cache=False) or {}
         n_pairs = data.get('n_pairs', 100)
         seed = data.get('seed', 0)
 
         # Run E91 protocol
-        results = e91_protocol(n_pairs=n_pairs, seed=seed)
-
-        # Prepare response - convert all numpy types to Python native types
-        response = {
-            'success': True,
-            'data': {
-                'n_pairs': int(results['n_pairs']),
-                'alice_bases': [int(x) for x in results['alice_bases']],
-                'bob_bases': [int(x) for x in results['bob_bases']],
-                'alice_outcomes': [int(x) for x in results['alice_outcomes']],
-                'bob_outcomes': [int(x) for x in results['bob_outcomes']],
-                'alice_sifted_key': [int(x) for x in results['alice_sifted_key']],
-                'bob_sifted_key': [int(x) for x in results['bob_sifted_key']],
-                'bob_corrected_key': [int(x) for x in results['bob_corrected_key']],
-                'qber': float(results['qber']),
-                'chsh_value': float(results['chsh_value']),
-                'bell_violated': bool(results['bell_violated']),
-                'key_length': int(len(results['alice_sifted_key'])),
-                'keys_match': bool(results['alice_sifted_key'] == results['bob_corrected_key'])
-            }
-        }
-
-        return jsonify(response)
+        return protocol_response(e91_response, n_pairs, seed)
 
     except Exception as e:
         return jsonify({
@@ -280,11 +780,53 @@ def run_e91():
         }), 500
 
 
+@lru_cache(maxsize=256)
+def simulate_e91_response(n_pairs, seed, eavesdropping_rate, noise_level, dark_count_rate):
+    """Run an E91 simulation and return the serialized JSON response body"""
+    # Run E91 protocol with accurate physics-based QBER
+    results = qiskit_e91.e91_protocol(
+        n_pairs=n_pairs,
+        seed=seed,
+        depolarization=noise_level,
+        eavesdropping_rate=eavesdropping_rate,
+        dark_count_rate=dark_count_rate,
+        bell_state='psi_minus'
+    )
+    
+    return orjson.dumps({
+        'success': True,
+        'data': {
+            'n_pairs': results['n_pairs'],
+            'bell_state': results['bell_state'],
+            'alice_bases': results['alice_bases'],
+            'bob_bases': results['bob_bases'],
+            'alice_outcomes': results['alice_outcomes'],
+            'bob_outcomes': results['bob_outcomes'],
+            'bell_test_count': results['bell_test_count'],
+            'key_gen_count': results['key_gen_count'],
+            'alice_sifted_key': results['alice_sifted_key'],
+            'bob_sifted_key': results['bob_sifted_key'],
+            'bob_corrected_key': results['bob_corrected_key'],
+            'qber': results['qber'],
+            'qber_percentage': results['qber_percentage'],
+            'chsh_s_value': results['chsh_s_value'],
+            'bell_violated': results['bell_violated'],
+            'expected_s_value': results['expected_s_value'],
+            'expected_qber': results['expected_qber'],
+            'correlations': results['correlations'],
+            'depolarization': results['depolarization'],
+            'eavesdropping_rate': results['eavesdropping_rate'],
+            'dark_count_rate': results['dark_count_rate'],
+        },
+        'analysis': qiskit_e91.analyze_e91_results(results)
+    }, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
 @app.route('/api/e91/simulate', methods=['POST'])
 def simulate_e91():
     """Run E91 simulation with accurate QBER calculation"""
     try:
-        data = request.get_json() or {}
+        data = request.get_json(silent=True, force=True, cache=False) or {}
         n_pairs = data.get('n_pairs', 1000)
         seed = data.get('seed', None)
         
@@ -293,48 +835,10 @@ def simulate_e91():
         noise_level = data.get('noise_level', 0) / 100  # 0-1
         dark_count_rate = data.get('dark_count_rate', 0.01)  # Default 1%
         
-        # Run E91 protocol with accurate physics-based QBER
-        results = e91_protocol(
-            n_pairs=n_pairs,
-            seed=seed,
-            depolarization=noise_level,
-            eavesdropping_rate=eavesdropping_rate,
-            dark_count_rate=dark_count_rate,
-            bell_state='psi_minus'
-        )
-        
-        response = {
-            'success': True,
-            'data': {
-                'n_pairs': results['n_pairs'],
-                'bell_state': results['bell_state'],
-                'alice_bases': results['alice_bases'],
-                'bob_bases': results['bob_bases'],
-                'alice_outcomes': results['alice_outcomes'],
-                'bob_outcomes': results['bob_outcomes'],
-                'bell_test_count': results['bell_test_count'],
-                'key_gen_count': results['key_gen_count'],
-                'alice_sifted_key': results['alice_sifted_key'],
-                'bob_sifted_key': results['bob_sifted_key'],
-                'bob_corrected_key': results['bob_corrected_key'],
-                'qber': results['qber'],
-                'qber_percentage': results['qber_percentage'],
-                'chsh_s_value': results['chsh_s_value'],
-                'bell_violated': results['bell_violated'],
-                'expected_s_value': results['expected_s_value'],
-                'expected_qber': results['expected_qber'],
-                'correlations': results['correlations'],
-                'depolarization': results['depolarization'],
-                'eavesdropping_rate': results['eavesdropping_rate'],
-                'dark_count_rate': results['dark_count_rate'],
-            },
-            'analysis': analyze_e91_results(results)
-        }
-        
-        return jsonify(response)
+        return protocol_response(simulate_e91_response, n_pairs, seed,
+                                 eavesdropping_rate, noise_level, dark_count_rate)
         
     except Exception as e:
-        import traceback
         return jsonify({
             'success': False,
             'error': str(e),
@@ -342,11 +846,50 @@ def simulate_e91():
         }), 500
 
 
+@lru_cache(maxsize=256)
+def simulate_b92_response(n_signals, seed, channel_loss, noise_level, eavesdropping_rate, dark_count_rate):
+    """Run a B92 simulation and return the serialized JSON response body"""
+    # Run B92 protocol with accurate physics-based QBER
+    results = b92_protocol(
+        n_signals=n_signals,
+        seed=seed,
+        channel_loss=channel_loss,
+        depolarization=noise_level,
+        eavesdropping_rate=eavesdropping_rate,
+        dark_count_rate=dark_count_rate
+    )
+    
+    return orjson.dumps({
+        'success': True,
+        'data': {
+            'n_signals': results['n_signals'],
+            'alice_bits': results['alice_bits'],
+            'alice_states': results['alice_bits'],  # State id: 0 = |0⟩, 1 = |+⟩
+            'bob_raw_results': results['bob_raw_results'],
+            'conclusive_count': results['conclusive_count'],
+            'inconclusive_count': results['inconclusive_count'],
+            'sifted_key_alice': results['sifted_key_alice'],
+            'sifted_key_bob': results['sifted_key_bob'],
+            'qber': results['qber'],
+            'qber_percentage': results['qber_percentage'],
+            'key_rate': results['key_rate'],
+            'key_rate_percentage': results['key_rate_percentage'],
+            'expected_qber': results['expected_qber'],
+            'expected_key_rate': results['expected_key_rate'],
+            'channel_loss': results['channel_loss'],
+            'depolarization': results['depolarization'],
+            'eavesdropping_rate': results['eavesdropping_rate'],
+            'dark_count_rate': results['dark_count_rate'],
+        },
+        'analysis': analyze_b92_results(results)
+    }, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
 @app.route('/api/b92/simulate', methods=['POST'])
 def simulate_b92():
     """Run B92 simulation with accurate QBER calculation using USD"""
     try:
-        data = request.get_json() or {}
+        data = request.get_json(silent=True, force=True, cache=False) or {}
         n_signals = data.get('n_signals', 1000)
         seed = data.get('seed', None)
         
@@ -356,45 +899,10 @@ def simulate_b92():
         eavesdropping_rate = data.get('eavesdropping_rate', 0) / 100  # 0-1
         dark_count_rate = data.get('dark_count_rate', 0.01)  # Default 1%
         
-        # Run B92 protocol with accurate physics-based QBER
-        results = b92_protocol(
-            n_signals=n_signals,
-            seed=seed,
-            channel_loss=channel_loss,
-            depolarization=noise_level,
-            eavesdropping_rate=eavesdropping_rate,
-            dark_count_rate=dark_count_rate
-        )
-        
-        response = {
-            'success': True,
-            'data': {
-                'n_signals': results['n_signals'],
-                'alice_bits': results['alice_bits'],
-                'alice_states': results['alice_states'],
-                'bob_raw_results': results['bob_raw_results'],
-                'conclusive_count': results['conclusive_count'],
-                'inconclusive_count': results['inconclusive_count'],
-                'sifted_key_alice': results['sifted_key_alice'],
-                'sifted_key_bob': results['sifted_key_bob'],
-                'qber': results['qber'],
-                'qber_percentage': results['qber_percentage'],
-                'key_rate': results['key_rate'],
-                'key_rate_percentage': results['key_rate_percentage'],
-                'expected_qber': results['expected_qber'],
-                'expected_key_rate': results['expected_key_rate'],
-                'channel_loss': results['channel_loss'],
-                'depolarization': results['depolarization'],
-                'eavesdropping_rate': results['eavesdropping_rate'],
-                'dark_count_rate': results['dark_count_rate'],
-            },
-            'analysis': analyze_b92_results(results)
-        }
-        
-        return jsonify(response)
+        return protocol_response(simulate_b92_response, n_signals, seed,
+                                 channel_loss, noise_level, eavesdropping_rate, dark_count_rate)
         
     except Exception as e:
-        import traceback
         return jsonify({
             'success': False,
             'error': str(e),
@@ -407,4 +915,6 @@ def health_check():
     return jsonify({'status': 'healthy', 'message': 'BB84/E91/B92 API is running'})
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server only. In production run under a WSGI server with a
+    # worker pool, e.g. `gunicorn -c gunicorn.conf.py app:app` (see README)
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=5000)
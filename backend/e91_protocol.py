@@ -19,36 +19,32 @@ def calculate_correlations(alice_outcomes, bob_outcomes, alice_bases, bob_bases)
     Returns:
         dict: Correlation statistics
     """
+    alice_bases = np.asarray(alice_bases, dtype=np.uint8)
+    bob_bases = np.asarray(bob_bases, dtype=np.uint8)
+    alice_outcomes = np.asarray(alice_outcomes, dtype=np.uint8)
+    bob_outcomes = np.asarray(bob_outcomes, dtype=np.uint8)
+    
+    same = alice_bases == bob_bases
+    mismatch = alice_outcomes != bob_outcomes  # Anti-correlation for psi_minus state
+    
     # Count correlations for each basis combination
+    same_count = int(np.count_nonzero(same))
     correlations = {
-        'same_basis': {'count': 0, 'matches': 0, 'correlations': 0},
-        'different_basis': {'count': 0, 'matches': 0, 'correlations': 0}
+        'same_basis': {
+            'count': same_count,
+            'matches': int(np.count_nonzero(same & mismatch)),
+            'correlations': 0
+        },
+        'different_basis': {
+            'count': same.size - same_count,
+            'matches': int(np.count_nonzero(~same & mismatch)),  # Random correlation for different bases
+            'correlations': 0
+        }
     }
     
-    for a_base, b_base, a_result, b_result in zip(alice_bases, bob_bases, alice_outcomes, bob_outcomes):
-        if a_base == b_base:
-            correlations['same_basis']['count'] += 1
-            if a_result != b_result:  # Anti-correlation for psi_minus state
-                correlations['same_basis']['matches'] += 1
-        else:
-            correlations['different_basis']['count'] += 1
-            if a_result != b_result:  # Random correlation for different bases
-                correlations['different_basis']['matches'] += 1
-    
     # Calculate correlation percentages
-    if correlations['same_basis']['count'] > 0:
-        correlations['same_basis']['correlation'] = (
-            correlations['same_basis']['matches'] / correlations['same_basis']['count']
-        )
-    else:
-        correlations['same_basis']['correlation'] = 0
-        
-    if correlations['different_basis']['count'] > 0:
-        correlations['different_basis']['correlation'] = (
-            correlations['different_basis']['matches'] / correlations['different_basis']['count']
-        )
-    else:
-        correlations['different_basis']['correlation'] = 0
+    for stats in correlations.values():
+        stats['correlation'] = stats['matches'] / stats['count'] if stats['count'] > 0 else 0
     
     return correlations
 
@@ -66,33 +62,22 @@ def calculate_chsh_correlation(alice_outcomes, bob_outcomes, alice_bases, bob_ba
     
     # Map our bases to CHSH test angles
     # Alice: bases 0,1 for CHSH; Bob: bases 1,2 for CHSH
-    chsh_terms = {'E_01': [], 'E_02': [], 'E_11': [], 'E_12': []}
-    
-    for a_base, b_base, a_result, b_result in zip(alice_bases, bob_bases, alice_outcomes, bob_outcomes):
-        # Map to CHSH test
-        if a_base == 0 and b_base == 1:  # Alice: Z, Bob: X
-            # Convert bit results to {-1, +1}
-            a_val = 1 if a_result == 0 else -1
-            b_val = 1 if b_result == 0 else -1
-            chsh_terms['E_01'].append(a_val * b_val)
-        elif a_base == 0 and b_base == 2:  # Alice: Z, Bob: 45-deg
-            a_val = 1 if a_result == 0 else -1
-            b_val = 1 if b_result == 0 else -1
-            chsh_terms['E_02'].append(a_val * b_val)
-        elif a_base == 1 and b_base == 1:  # Alice: X, Bob: X
-            a_val = 1 if a_result == 0 else -1
-            b_val = 1 if b_result == 0 else -1
-            chsh_terms['E_11'].append(a_val * b_val)
-        elif a_base == 1 and b_base == 2:  # Alice: X, Bob: 45-deg
-            a_val = 1 if a_result == 0 else -1
-            b_val = 1 if b_result == 0 else -1
-            chsh_terms['E_12'].append(a_val * b_val)
+    # Label each pair by its basis combination (alice_base * 3 + bob_base, 0-8)
+    pair_labels = np.asarray(alice_bases, dtype=np.intp) * 3 + np.asarray(bob_bases, dtype=np.intp)
+    
+    # Convert bit results to {-1, +1} and take the product per pair
+    prod = (1 - 2 * np.asarray(alice_outcomes, dtype=np.int8)) * (1 - 2 * np.asarray(bob_outcomes, dtype=np.int8))
+    
+    # Mean product for every basis combination in one pass (0 where a combination never occurs)
+    sums = np.bincount(pair_labels, weights=prod, minlength=9)
+    counts = np.bincount(pair_labels, minlength=9)
+    expectations = np.divide(sums, counts, out=np.zeros(9), where=counts > 0)
     
     # Calculate expectation values
-    E_01 = np.mean(chsh_terms['E_01']) if chsh_terms['E_01'] else 0
-    E_02 = np.mean(chsh_terms['E_02']) if chsh_terms['E_02'] else 0
-    E_11 = np.mean(chsh_terms['E_11']) if chsh_terms['E_11'] else 0
-    E_12 = np.mean(chsh_terms['E_12']) if chsh_terms['E_12'] else 0
+    E_01 = float(expectations[0 * 3 + 1])  # Alice: Z, Bob: X
+    E_02 = float(expectations[0 * 3 + 2])  # Alice: Z, Bob: 45-deg
+    E_11 = float(expectations[1 * 3 + 1])  # Alice: X, Bob: X
+    E_12 = float(expectations[1 * 3 + 2])  # Alice: X, Bob: 45-deg
     
     # CHSH value: E(a0,b1) - E(a0,b2) + E(a1,b1) + E(a1,b2)
     chsh_value = E_01 - E_02 + E_11 + E_12
@@ -111,24 +96,16 @@ def e91_protocol(n_pairs=100, seed=0):
     Returns:
         dict: Results of the E91 protocol
     """
-    np.random.seed(seed)
+    rng = np.random.default_rng(seed)
     
     # Generate random measurement bases for Alice and Bob
-    alice_bases = np.random.choice([0, 1, 2], size=n_pairs)
-    bob_bases = np.random.choice([0, 1, 2], size=n_pairs)
+    alice_bases = rng.integers(0, 3, size=n_pairs, dtype=np.uint8)
+    bob_bases = rng.integers(0, 3, size=n_pairs, dtype=np.uint8)
     
     # Simulate outcomes based on quantum entanglement principles
-    # For psi-minus state, Alice and Bob should have perfectly anti-correlated results
-    alice_outcomes = []
-    bob_outcomes = []
-    
-    for i in range(n_pairs):
-        # For entangled psi-minus state, if Alice measures 0, Bob should measure 1 (and vice versa)
-        alice_bit = np.random.randint(2)
-        bob_bit = 1 - alice_bit  # Perfect anti-correlation initially
-        
-        alice_outcomes.append(alice_bit)
-        bob_outcomes.append(bob_bit)
+    # For entangled psi-minus state, if Alice measures 0, Bob should measure 1 (and vice versa)
+    alice_outcomes = rng.integers(0, 2, size=n_pairs, dtype=np.uint8)
+    bob_outcomes = 1 - alice_outcomes  # Perfect anti-correlation initially
     
     # Calculate correlations
     correlations = calculate_correlations(alice_outcomes, bob_outcomes, alice_bases, bob_bases)
@@ -137,28 +114,24 @@ def e91_protocol(n_pairs=100, seed=0):
     chsh_value, chsh_expectations = calculate_chsh_correlation(alice_outcomes, bob_outcomes, alice_bases, bob_bases)
     
     # Generate sifted key (only for matching bases)
-    sifted_indices = [i for i in range(n_pairs) if alice_bases[i] == bob_bases[i]]
-    alice_sifted_key = [alice_outcomes[i] for i in sifted_indices]
-    bob_sifted_key = [bob_outcomes[i] for i in sifted_indices]
+    sifted_mask = alice_bases == bob_bases
+    alice_sifted_key = alice_outcomes[sifted_mask]
+    bob_sifted_key = bob_outcomes[sifted_mask]
     
     # For psi-minus state, Alice and Bob should have opposite results
     # So we flip Bob's bits to align with Alice's
-    bob_corrected_key = [1 - bit for bit in bob_sifted_key]
+    bob_corrected_key = bob_sifted_key ^ np.uint8(1)
     
     # Calculate QBER (Quantum Bit Error Rate) for matching bases
-    if len(alice_sifted_key) > 0:
-        errors = sum(a != b for a, b in zip(alice_sifted_key, bob_corrected_key))
-        qber = errors / len(alice_sifted_key)
-    else:
-        qber = 0
+    qber = float(np.mean(alice_sifted_key != bob_corrected_key)) if alice_sifted_key.size else 0
     
     # Determine if Bell inequality is violated (security check)
     bell_violated = abs(chsh_value) > 2  # Classical limit is 2, quantum can reach ~2.828
     
     return {
         'n_pairs': n_pairs,
-        'alice_bases': alice_bases.tolist(),
-        'bob_bases': bob_bases.tolist(),
+        'alice_bases': alice_bases,
+        'bob_bases': bob_bases,
         'alice_outcomes': alice_outcomes,
         'bob_outcomes': bob_outcomes,
         'alice_sifted_key': alice_sifted_key,
@@ -0,0 +1,29 @@
+"""
+Gunicorn configuration for the BB84/E91/B92 API
+
+Run from the backend directory:
+    gunicorn -c gunicorn.conf.py app:app
+"""
+
+import multiprocessing
+import os
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+
+# Protocol simulations are CPU-bound, so run one worker process per core. Each
+# worker runs at most cpu_count // workers execute-python scripts at once (see
+# EXECUTION_WORKERS in app.py), so the host stays at about one busy process per core.
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+
+# Threads keep a worker responsive while one request waits on IBM Quantum
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Handlers are synchronous and stay that way: CPU-bound work gains nothing from
+# an event loop, and user code already runs in a separate process pool. These
+# settings let long requests (hardware jobs, large simulations) finish cleanly.
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 120))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', 60))
+
+# Reuse connections for the frontend's back-to-back requests
+keepalive = 5
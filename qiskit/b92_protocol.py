@@ -65,55 +65,98 @@ def create_measurement_operators() -> Tuple[np.ndarray, np.ndarray]:
     return M_0, M_1
 
 
-def measure_b92(state: np.ndarray, M_0: np.ndarray, M_1: np.ndarray,
-                dark_count_rate: float = 0.0) -> Tuple[int, bool]:
+# B92 states and measurement operators are constants, so build them once
+STATE_0, STATE_1 = create_b92_states()
+M_0, M_1 = create_measurement_operators()
+
+# Every state that can reach Bob, indexed by id:
+# 0: |0⟩ and 1: |+⟩ (Alice's states), 2: |1⟩ and 3: |-⟩ (their orthogonal partners)
+KETS = np.array([STATE_0, STATE_1, np.array([0, 1]), np.array([1, -1]) / np.sqrt(2)])
+
+# Born rule per state: P(conclusive 0) = ⟨ψ|M_0|ψ⟩, P(conclusive 1) = ⟨ψ|M_1|ψ⟩
+BORN_0 = np.einsum('ki,ij,kj->k', KETS.conj(), M_0, KETS).real
+BORN_1 = np.einsum('ki,ij,kj->k', KETS.conj(), M_1, KETS).real
+
+# Shared by every call, so guard against accidental in-place edits
+for _constant in (STATE_0, STATE_1, M_0, M_1, KETS, BORN_0, BORN_1):
+    _constant.setflags(write=False)
+
+
+def b92_outcome_probabilities(channel_loss: float, depolarization: float,
+                              eavesdropping_rate: float, dark_count_rate: float) -> np.ndarray:
     """
-    Perform B92 measurement
+    Probability of each of Bob's outcomes given Alice's bit
+    
+    Eve's intercept-resend and depolarization only ever send one of the four
+    states in KETS, and the dark counts only add one of four click patterns,
+    so the whole channel folds into a small table once per set of parameters:
+    - Loss: the photon never arrives (inconclusive)
+    - Eve (rate e): resends one of the four states uniformly at random
+    - Depolarization (p): with probability p/2 the state is replaced by the
+      one orthogonal to Alice's, overriding Eve's
+    - Dark counts (rate d): each detector independently adds d to its click
+      probability, renormalized by the total
     
     Args:
-        state: Input quantum state (2D vector)
-        M_0: Measurement operator for detecting |0⟩
-        M_1: Measurement operator for detecting |+⟩
-        dark_count_rate: Probability of dark count in SPAD
+        channel_loss: Photon loss probability (0 to 1)
+        depolarization: Depolarization probability (0 to 1)
+        eavesdropping_rate: Probability of Eve intercepting (0 to 1)
+        dark_count_rate: SPAD dark count probability (0 to 1)
+        (scalars, or equal-shape arrays for one table per entry)
     
     Returns:
-        Tuple of (measured_bit, is_conclusive)
-        - is_conclusive=True means Bob got a definite bit value
-        - is_conclusive=False means inconclusive (no detection)
+        Array of shape (..., 2, 3) indexed [alice_bit] giving
+        (P(conclusive 0), P(conclusive 1), P(inconclusive))
     """
-    # Calculate probabilities using Born rule
-    # P(conclusive 0) = ⟨ψ|M_0|ψ⟩
-    # P(conclusive 1) = ⟨ψ|M_1|ψ⟩
-    
-    prob_0 = np.real(np.vdot(state, M_0 @ state))
-    prob_1 = np.real(np.vdot(state, M_1 @ state))
-    prob_inconclusive = 1 - prob_0 - prob_1
-    
-    # Apply dark counts (can cause false conclusive clicks)
-    dark_count_0 = np.random.random() < dark_count_rate
-    dark_count_1 = np.random.random() < dark_count_rate
-    
-    # Add dark count probability to conclusive outcomes
-    if dark_count_0:
-        prob_0 += dark_count_rate
-    if dark_count_1:
-        prob_1 += dark_count_rate
-    
-    # Normalize
-    total = prob_0 + prob_1 + prob_inconclusive
-    prob_0 /= total
-    prob_1 /= total
-    prob_inconclusive /= total
-    
-    # Generate random outcome
-    r = np.random.random()
-    
-    if r < prob_0:
-        return 0, True  # Conclusive: bit 0
-    elif r < prob_0 + prob_1:
-        return 1, True  # Conclusive: bit 1
-    else:
-        return -1, False  # Inconclusive
+    channel_loss, depolarization, eavesdropping_rate, dark_count_rate = (
+        np.asarray(x, dtype=float)[..., None, None]
+        for x in (channel_loss, depolarization, eavesdropping_rate, dark_count_rate))
+    
+    # P(state id arriving | Alice's bit): rows are Alice's bits, columns are KETS ids
+    flip = depolarization / 2
+    ket_probs = ((1 - flip) * eavesdropping_rate / 4 * np.ones((2, 4))
+                 + (1 - flip) * (1 - eavesdropping_rate) * np.eye(2, 4)
+                 + flip * np.eye(2, 4, k=2))
+    
+    # P(outcome | state id), averaged over the four dark-count patterns
+    c = dark_count_rate[..., 0]
+    ket_outcomes = 0
+    for dark_0 in (0, 1):
+        for dark_1 in (0, 1):
+            weight = (c if dark_0 else 1 - c) * (c if dark_1 else 1 - c)
+            total = 1 + (dark_0 + dark_1) * c  # Normalization
+            p_0 = np.minimum(BORN_0 + dark_0 * c, total)
+            p_01 = np.minimum(BORN_0 + BORN_1 + (dark_0 + dark_1) * c, total)
+            ket_outcomes = ket_outcomes + (weight / total)[..., None] * np.stack([p_0, p_01 - p_0, total - p_01], axis=-1)
+    
+    return (1 - channel_loss) * (ket_probs @ ket_outcomes) + channel_loss * np.array([0.0, 0.0, 1.0])
+
+
+def sample_b92_outcomes(alice_bits: np.ndarray, r: np.ndarray,
+                        outcome_probs: np.ndarray) -> np.ndarray:
+    """
+    Sample Bob's detector outcomes with one uniform draw per signal
+    
+    Works on a single run (alice_bits of shape (n,) with a (2, 3) table) or
+    many runs at once ((trials, n) with a (trials, 2, 3) table).
+    
+    Args:
+        alice_bits: Alice's bits
+        r: Uniform draws in [0, 1), shaped like alice_bits
+        outcome_probs: Table from b92_outcome_probabilities
+    
+    Returns:
+        int8 array shaped like alice_bits: 0/1 for a conclusive bit, -1 for no click
+    """
+    cumulative = np.cumsum(outcome_probs, axis=-1)
+    p_0 = np.take_along_axis(cumulative[..., 0], alice_bits, axis=-1)
+    p_01 = np.take_along_axis(cumulative[..., 1], alice_bits, axis=-1)
+    
+    bob_raw_results = np.full(alice_bits.shape, -1, dtype=np.int8)
+    bob_raw_results[r < p_01] = 1
+    bob_raw_results[r < p_0] = 0
+    
+    return bob_raw_results
 
 
 def b92_protocol(n_signals: int = 1000,
@@ -121,7 +164,8 @@ def b92_protocol(n_signals: int = 1000,
                  channel_loss: float = 0.0,
                  depolarization: float = 0.0,
                  eavesdropping_rate: float = 0.0,
-                 dark_count_rate: float = 0.0) -> Dict:
+                 dark_count_rate: float = 0.0,
+                 rng: np.random.Generator = None) -> Dict:
     """
     Execute the B92 quantum key distribution protocol with accurate QBER calculation
     
@@ -132,103 +176,55 @@ def b92_protocol(n_signals: int = 1000,
         depolarization: Depolarization probability (0 to 1)
         eavesdropping_rate: Probability of Eve intercepting (0 to 1)
         dark_count_rate: SPAD dark count probability (0 to 1)
+        rng: Random generator to draw from; takes precedence over seed, e.g.
+             a child of Generator.spawn for independent parallel trials
     
     Returns:
-        Dictionary containing:
+        Dictionary containing (per-signal data as NumPy arrays):
         - n_signals: Number of signals sent
-        - alice_bits: Alice's random bit sequence
-        - alice_states: States prepared by Alice ('0' or '+')
-        - bob_measurements: Bob's measurement results
+        - alice_bits: Alice's random bit sequence, which doubles as the id
+          of the prepared state in KETS (0: |0⟩, 1: |+⟩)
+        - bob_measurements: Bob's measurement results as (bit_value, is_conclusive) rows
         - conclusive_indices: Indices with conclusive detections
         - inconclusive_indices: Indices with inconclusive results
         - sifted_key_alice: Alice's bits for conclusive measurements
         - sifted_key_bob: Bob's conclusive bit values
+        - errors: Mismatched bits in the sifted key
         - qber: Quantum Bit Error Rate
         - qber_percentage: QBER as percentage
         - key_rate: Fraction of signals that became sifted key
         - expected_qber: Theoretical QBER given parameters
         - expected_key_rate: Theoretical key rate
     """
-    if seed is not None:
-        np.random.seed(seed)
-    
-    # Get B92 states and measurement operators
-    state_0, state_1 = create_b92_states()
-    M_0, M_1 = create_measurement_operators()
-    
-    states = {'0': state_0, '+': state_1}
+    if rng is None:
+        rng = np.random.default_rng(seed)
     
     # Generate Alice's random bits
-    alice_bits = np.random.randint(2, size=n_signals)
-    alice_states = ['0' if bit == 0 else '+' for bit in alice_bits]
+    alice_bits = rng.integers(0, 2, size=n_signals, dtype=np.uint8)
     
-    # Bob's measurements
-    bob_measurements = []  # (bit_value, is_conclusive)
-    bob_raw_results = []
-    conclusive_flags = []
+    # Bob's outcomes as int8: 0/1 for a conclusive bit, -1 for no click
+    outcome_probs = b92_outcome_probabilities(channel_loss, depolarization, eavesdropping_rate, dark_count_rate)
+    bob_raw_results = sample_b92_outcomes(alice_bits, rng.random(n_signals), outcome_probs)
+    conclusive_flags = bob_raw_results >= 0
     
-    for i in range(n_signals):
-        # Get Alice's prepared state
-        prepared_state = states[alice_states[i]].copy()
-        
-        # Check for channel loss (photon didn't arrive)
-        if np.random.random() < channel_loss:
-            bob_measurements.append((-1, False))
-            bob_raw_results.append(-1)
-            conclusive_flags.append(False)
-            continue
-        
-        # Check for eavesdropping (intercept-resend attack)
-        if np.random.random() < eavesdropping_rate:
-            # Eve measures in random basis and resends
-            eve_basis = np.random.choice(['0', '+'])
-            # Eve's measurement collapses the state
-            if eve_basis == '0':
-                # Eve measures in {|0⟩, |1⟩} basis
-                if np.random.random() < 0.5:
-                    prepared_state = state_0
-                else:
-                    prepared_state = np.array([0, 1])  # |1⟩
-            else:
-                # Eve measures in {|+⟩, |-⟩} basis
-                if np.random.random() < 0.5:
-                    prepared_state = state_1
-                else:
-                    prepared_state = np.array([1, -1]) / np.sqrt(2)  # |-⟩
-        
-        # Apply depolarization (quantum noise)
-        if np.random.random() < depolarization:
-            # State becomes maximally mixed with some probability
-            if np.random.random() < 0.5:
-                # Flip to orthogonal state
-                if alice_states[i] == '0':
-                    prepared_state = np.array([0, 1])
-                else:
-                    prepared_state = np.array([1, -1]) / np.sqrt(2)
-        
-        # Bob performs measurement
-        bit_value, is_conclusive = measure_b92(
-            prepared_state, M_0, M_1, dark_count_rate
-        )
-        
-        bob_measurements.append((bit_value, is_conclusive))
-        bob_raw_results.append(bit_value)
-        conclusive_flags.append(is_conclusive)
+    bob_measurements = np.column_stack((bob_raw_results, conclusive_flags))  # Rows of (bit_value, is_conclusive)
     
     # Extract conclusive and inconclusive subsets
-    conclusive_indices = [i for i in range(n_signals) if conclusive_flags[i]]
-    inconclusive_indices = [i for i in range(n_signals) if not conclusive_flags[i]]
+    conclusive_indices = np.flatnonzero(conclusive_flags)
+    inconclusive_indices = np.flatnonzero(~conclusive_flags)
     
     # Sifted key: only conclusive measurements
-    sifted_key_alice = [alice_bits[i] for i in conclusive_indices]
-    sifted_key_bob = [bob_raw_results[i] for i in conclusive_indices]
+    sifted_key_alice = alice_bits[conclusive_indices]
+    sifted_key_bob = bob_raw_results[conclusive_indices]
     
     # Calculate QBER: errors in sifted key / total sifted key
     # Error occurs when Bob's conclusive measurement doesn't match Alice's bit
+    # (conclusive results are 0/1, so the int8 view as uint8 is exact and XOR marks the errors)
     if len(sifted_key_alice) > 0:
-        errors = sum(a != b for a, b in zip(sifted_key_alice, sifted_key_bob))
+        errors = int(np.count_nonzero(np.bitwise_xor(sifted_key_alice, sifted_key_bob.view(np.uint8))))
         qber = errors / len(sifted_key_alice)
     else:
+        errors = 0
         qber = 0.0
     
     # Calculate key rate (fraction of signals that became sifted key)
@@ -248,8 +244,7 @@ def b92_protocol(n_signals: int = 1000,
     
     return {
         'n_signals': n_signals,
-        'alice_bits': alice_bits.tolist(),
-        'alice_states': alice_states,
+        'alice_bits': alice_bits,
         'bob_measurements': bob_measurements,
         'bob_raw_results': bob_raw_results,
         'conclusive_indices': conclusive_indices,
@@ -258,6 +253,7 @@ def b92_protocol(n_signals: int = 1000,
         'inconclusive_count': len(inconclusive_indices),
         'sifted_key_alice': sifted_key_alice,
         'sifted_key_bob': sifted_key_bob,
+        'errors': errors,
         'qber': qber,
         'qber_percentage': qber * 100,
         'key_rate': key_rate,
@@ -271,6 +267,62 @@ def b92_protocol(n_signals: int = 1000,
     }
 
 
+def b92_batched(param_grid: np.ndarray, n_signals: int = 1000, seed: int = None,
+                rng: np.random.Generator = None) -> Dict:
+    """
+    Run many B92 trials at once, one per row of noise parameters
+    
+    All trials are sampled together as (n_trials, n_signals) arrays, so a
+    parameter sweep or Monte Carlo study costs one vectorized pass instead of
+    one b92_protocol call per trial. Only per-trial statistics are returned.
+    
+    Args:
+        param_grid: Array of shape (n_trials, 4) with columns
+            (channel_loss, depolarization, eavesdropping_rate, dark_count_rate)
+        n_signals: Number of quantum signals per trial
+        seed: Random seed for reproducibility
+        rng: Random generator to draw from; takes precedence over seed, e.g.
+             a child of Generator.spawn for independent parallel trials
+    
+    Returns:
+        Dictionary of arrays with one entry per trial:
+        - conclusive_count, errors, qber, key_rate
+        - expected_qber, expected_key_rate
+        plus the four parameter columns under their usual names
+    """
+    params = np.atleast_2d(np.asarray(param_grid, dtype=float))
+    n_trials = len(params)
+    
+    channel_loss, depolarization, eavesdropping_rate, dark_count_rate = params.T
+    
+    if rng is None:
+        rng = np.random.default_rng(seed)
+    alice_bits = rng.integers(0, 2, size=(n_trials, n_signals), dtype=np.uint8)
+    
+    # One outcome table per trial, then one uniform draw per signal
+    outcome_probs = b92_outcome_probabilities(channel_loss, depolarization, eavesdropping_rate, dark_count_rate)
+    bob_raw_results = sample_b92_outcomes(alice_bits, rng.random((n_trials, n_signals)), outcome_probs)
+    conclusive = bob_raw_results >= 0
+    
+    conclusive_count = np.count_nonzero(conclusive, axis=1)
+    errors = np.count_nonzero(conclusive & (bob_raw_results.view(np.uint8) != alice_bits), axis=1)
+    qber = np.divide(errors, conclusive_count, out=np.zeros(n_trials), where=conclusive_count > 0)
+    
+    return {
+        'n_signals': n_signals,
+        'conclusive_count': conclusive_count,
+        'errors': errors,
+        'qber': qber,
+        'key_rate': conclusive_count / n_signals,
+        'expected_qber': (depolarization + eavesdropping_rate) / 2 + dark_count_rate,
+        'expected_key_rate': 0.25 * (1 - channel_loss) * (1 - depolarization - eavesdropping_rate),
+        'channel_loss': channel_loss,
+        'depolarization': depolarization,
+        'eavesdropping_rate': eavesdropping_rate,
+        'dark_count_rate': dark_count_rate,
+    }
+
+
 def analyze_b92_results(results: Dict) -> str:
     """
     Analyze B92 protocol results and return formatted analysis string
@@ -299,9 +351,7 @@ def analyze_b92_results(results: Dict) -> str:
     analysis.append("QBER Calculation (Conclusive Measurements Only):")
     analysis.append(f"  QBER = N_errors / N_sifted_subset")
     
-    # Count errors
-    errors = sum(a != b for a, b in zip(results['sifted_key_alice'], results['sifted_key_bob']))
-    analysis.append(f"  QBER = {errors} / {len(results['sifted_key_alice'])}")
+    analysis.append(f"  QBER = {results['errors']} / {results['conclusive_count']}")
     analysis.append(f"  QBER: {results['qber_percentage']:.2f}%")
     analysis.append(f"  Expected QBER: {results['expected_qber']*100:.2f}%")
     analysis.append("")
@@ -335,6 +385,8 @@ def analyze_b92_results(results: Dict) -> str:
 
 
 if __name__ == "__main__":
+    from concurrent.futures import ProcessPoolExecutor
+    
     print("B92 Quantum Key Distribution Protocol")
     print("=" * 50)
     
@@ -346,16 +398,18 @@ if __name__ == "__main__":
         {'depolarization': 0.10, 'eavesdropping_rate': 0.05, 'dark_count_rate': 0.02},
     ]
     
-    for i, params in enumerate(test_cases):
-        print(f"\n{'='*50}")
-        print(f"Test Case {i+1}: {params}")
-        print(f"{'='*50}")
-        
-        results = b92_protocol(
-            n_signals=5000,
-            seed=42 + i,
-            channel_loss=0.1,
-            **params
-        )
+    # Independent random streams per case, so the cases can run in parallel
+    child_rngs = np.random.default_rng(42).spawn(len(test_cases))
+    
+    with ProcessPoolExecutor() as executor:
+        futures = [
+            executor.submit(b92_protocol, n_signals=5000, rng=child_rng, channel_loss=0.1, **params)
+            for params, child_rng in zip(test_cases, child_rngs)
+        ]
         
-        print(analyze_b92_results(results))
+        for i, (params, future) in enumerate(zip(test_cases, futures)):
+            print(f"\n{'='*50}")
+            print(f"Test Case {i+1}: {params}")
+            print(f"{'='*50}")
+            
+            print(analyze_b92_results(future.result()))
@@ -1,123 +1,261 @@
-from qiskit import QuantumCircuit, transpile
-from qiskit_ibm_runtime import QiskitRuntimeService, SamplerV2 as Sampler
-import numpy as np
+import asyncio
+import os
+from functools import lru_cache
 
-# API key 
-QiskitRuntimeService.save_account(
-    token="9adff89261955158875988e70e83aa0f37ef7841638fb46890b015467f5d39c8d194d2d3ac1ac069af61e6c5270a053f6e1ecd141b52313393b5ea06c38770d3",
-    channel="ibm_cloud",
-    overwrite=True
-)
-
-# Encoding function
-def encode_message(bits, bases):
-    circuits = []
-    for bit, basis in zip(bits, bases):
-        qc = QuantumCircuit(1, 1)
-        # Z-basis: apply X 
-        if basis == 0:
-            if bit == 1:
-                qc.x(0)
-        # X-basis: prepare state by applying H & X 
-        else:
-            if bit == 0:
-                qc.h(0)
-            else:
-                qc.x(0)
-                qc.h(0)
-        circuits.append(qc)
-    return circuits
-
-# Measurement function
-def measure_message(circuits, bases):
-    measured_circuits = []
-    for qc, basis in zip(circuits, bases):
-        measured_qc = qc.copy()
-        if basis == 1:  # For X-basis, apply H before measurement.
-            measured_qc.h(0)
-        measured_qc.measure(0, 0)
-        measured_circuits.append(measured_qc)
-    return measured_circuits
-
-# Filter bits 
-def remove_garbage(a_bases, b_bases, bits):
-    return [bit for i, bit in enumerate(bits) if a_bases[i] == b_bases[i]]
+from qiskit import QuantumCircuit
+from qiskit.circuit import ParameterVector
+from qiskit.transpiler import generate_preset_pass_manager
+from qiskit_ibm_runtime import Batch, QiskitRuntimeService, SamplerV2 as Sampler
+import numpy as np
 
 # Create circuit 
 def create_full_circuit(alice_bits, alice_bases, bob_bases):
     n_qubits = len(alice_bits)
     qc = QuantumCircuit(n_qubits, n_qubits)
     
-    # Alice's state preparation.
-    for i in range(n_qubits):
-        if alice_bases[i] == 0:  # Z-basis
-            if alice_bits[i] == 1:
-                qc.x(i)
-        else:
-            if alice_bits[i] == 0:
-                qc.h(i)
-            else:
-                qc.x(i)
-                qc.h(i)
+    # Qubit index groups (gate calls reject an empty list)
+    x_qubits = np.flatnonzero(np.asarray(alice_bits) == 1).tolist()
+    alice_h_qubits = np.flatnonzero(np.asarray(alice_bases) == 1).tolist()
+    bob_h_qubits = np.flatnonzero(np.asarray(bob_bases) == 1).tolist()
+    
+    # Alice's state preparation, one gate call per group of qubits:
+    # X for bit 1 (either basis), then H for the X-basis qubits.
+    if x_qubits:
+        qc.x(x_qubits)
+    if alice_h_qubits:
+        qc.h(alice_h_qubits)
     qc.barrier()
     
     # Bob's measurement
-    for i in range(n_qubits):
-        if bob_bases[i] == 1:
-            qc.h(i)
-    qc.measure_all()
+    if bob_h_qubits:
+        qc.h(bob_h_qubits)
+    qc.barrier()
+    qc.measure(range(n_qubits), range(n_qubits))
     
     return qc
 
-def bb84_protocol(n_bits=4, seed=0):
-    np.random.seed(seed)
-    
-    # Alice's random bits and bases.
-    alice_bits = np.random.randint(2, size=n_bits)
-    alice_bases = np.random.randint(2, size=n_bits)
+# Native gates of IBM backends that the hand-built circuit is written in
+ISA_GATES = ('x', 'sx', 'rz', 'measure')
+
+# Physical qubits a run of n_qubits uses when written in ISA_GATES: those that run
+# every ISA gate natively, lowest readout plus gate error first (what VF2Layout would
+# weigh when transpiling). None when the backend has too few such qubits.
+# n_qubits comes from the request, so only the most recently used sizes stay cached.
+@lru_cache(maxsize=32)
+def select_isa_qubits(backend, n_qubits):
+    target = backend.target
+    qubit_errors = {}
+    for qubit in range(target.num_qubits):
+        if not all(target.instruction_supported(gate, (qubit,)) for gate in ISA_GATES):
+            continue
+        properties = (target[gate].get((qubit,)) for gate in ISA_GATES if gate != 'rz')
+        qubit_errors[qubit] = sum(p.error or 0.0 for p in properties if p is not None)
+    if len(qubit_errors) < n_qubits:
+        return None
+    return tuple(sorted(qubit_errors, key=qubit_errors.get)[:n_qubits])
+
+# Same circuit as create_full_circuit, emitted in the backend's native gates
+# (H = RZ(π/2)·SX·RZ(π/2) up to global phase) on the given physical qubits of an
+# n_physical-qubit device, so it can be submitted without transpiling.
+# Bit i is prepared on physical_qubits[i] and measured into clbit i.
+def create_isa_circuit(alice_bits, alice_bases, bob_bases, physical_qubits, n_physical):
+    n_qubits = len(alice_bits)
+    physical_qubits = np.asarray(physical_qubits)
+    qc = QuantumCircuit(n_physical, n_qubits)
     
-    # Circuits for each qubit.
-    message = encode_message(alice_bits, alice_bases)
+    def h(qubits):
+        if qubits:
+            qc.rz(np.pi / 2, qubits)
+            qc.sx(qubits)
+            qc.rz(np.pi / 2, qubits)
     
-    # Bob's random measurement bases.
-    bob_bases = np.random.randint(2, size=n_bits)
-    bob_circuits = measure_message(message, bob_bases)
+    x_qubits = physical_qubits[np.asarray(alice_bits) == 1].tolist()
+    if x_qubits:
+        qc.x(x_qubits)
+    h(physical_qubits[np.asarray(alice_bases) == 1].tolist())
+    qc.barrier()
     
-    # Full circuit
-    full_circuit = create_full_circuit(alice_bits, alice_bases, bob_bases)
+    h(physical_qubits[np.asarray(bob_bases) == 1].tolist())
+    qc.barrier()
+    qc.measure(physical_qubits.tolist(), range(n_qubits))
     
+    return qc
+
+# BB84 circuit with the bits and bases as parameters, so it can be transpiled once:
+# RX(π·bit) prepares |bit⟩ and RY(±π/2·basis) rotates into / out of the X basis
+# (H up to a sign per state, which measurement cannot see)
+def create_parameterized_circuit(n_qubits):
+    bits = ParameterVector('bit', n_qubits)
+    alice_bases = ParameterVector('alice_basis', n_qubits)
+    bob_bases = ParameterVector('bob_basis', n_qubits)
+    qc = QuantumCircuit(n_qubits, n_qubits)
     
-    service = QiskitRuntimeService(channel="ibm_cloud", instance="ibm-q/open/main")
-    backend = service.backend("ibm_kyiv")
+    for i in range(n_qubits):
+        qc.rx(np.pi * bits[i], i)
+        qc.ry(np.pi / 2 * alice_bases[i], i)
+    qc.barrier()
     
-    # Run circuit
-    sampler = Sampler(mode=backend)
+    for i in range(n_qubits):
+        qc.ry(-np.pi / 2 * bob_bases[i], i)
+    qc.measure(range(n_qubits), range(n_qubits))
     
-    transpiled_circuits = transpile(bob_circuits, backend)
+    return qc, (bits, alice_bases, bob_bases)
+
+# Backend handle, opened on first use and shared by every later run.
+# The API key comes from QISKIT_IBM_TOKEN, or from an account saved once with
+# QiskitRuntimeService.save_account() when the variable is unset.
+@lru_cache(maxsize=1)
+def get_backend():
+    service = QiskitRuntimeService(channel="ibm_cloud", token=os.environ.get("QISKIT_IBM_TOKEN"),
+                                   instance="ibm-q/open/main")
+    return service.backend("ibm_kyiv")
+
+# Transpiler pipeline per backend, built once from its target and reused by every run
+@lru_cache(maxsize=None)
+def get_pass_manager(backend):
+    return generate_preset_pass_manager(optimization_level=1, backend=backend)
+
+# Parameterized circuit per backend and size, transpiled on first use. n_qubits comes
+# from the request, so only the most recently used sizes stay cached.
+@lru_cache(maxsize=16)
+def get_transpiled_template(backend, n_qubits):
+    template, parameters = create_parameterized_circuit(n_qubits)
+    return get_pass_manager(backend).run(template), parameters
+
+# Backend-ready circuit for a prepared run: only parameter binding per call
+def bind_transpiled_template(backend, run):
+    template, (bits, alice_bases, bob_bases) = get_transpiled_template(backend, len(run['alice_bits']))
+    return template.assign_parameters({
+        bits: run['alice_bits'].tolist(),
+        alice_bases: run['alice_bases'].tolist(),
+        bob_bases: run['bob_bases'].tolist(),
+    })
+
+# Sampler per backend
+@lru_cache(maxsize=None)
+def get_sampler(backend):
+    return Sampler(mode=backend)
+
+# Random bits and bases for one run, plus the circuit that runs it
+def prepare_bb84(n_bits, seed):
+    # Per-run generator: no shared global state between runs
+    rng = np.random.default_rng(seed)
     
-    # 1 shot per circuit.
-    job = sampler.run(transpiled_circuits, shots=1)
-    result = job.result()
+    # Alice's random bits and bases.
+    alice_bits = rng.integers(0, 2, size=n_bits, dtype=np.uint8)
+    alice_bases = rng.integers(0, 2, size=n_bits, dtype=np.uint8)
     
-    # Extract measurement outcomes.
-    counts_list = [res.data.c.get_counts() for res in result]
-    bob_measured_bits = [int(list(count.keys())[0], 2) for count in counts_list]
+    # Bob's random measurement bases.
+    bob_bases = rng.integers(0, 2, size=n_bits, dtype=np.uint8)
     
-    # Generate sifted keys by comparing bases.
-    alice_key = remove_garbage(alice_bases, bob_bases, alice_bits)
-    bob_key = remove_garbage(alice_bases, bob_bases, bob_measured_bits)
+    # One circuit holding every qubit: Alice's preparation and Bob's measurement
+    full_circuit = create_full_circuit(alice_bits, alice_bases, bob_bases)
     
     return {
         'alice_bits': alice_bits,
         'alice_bases': alice_bases,
         'bob_bases': bob_bases,
+        'full_circuit': full_circuit
+    }
+
+# Shot count actually run: an even count is rounded up to the next odd one, so the
+# per-qubit majority vote in collect_bb84 never ties (a tie rule would bias Bob's bits)
+def odd_shots(shots):
+    return shots | 1
+
+# Sift keys for a prepared run from its sampler result
+def collect_bb84(run, pub_result, job_id):
+    # Extract measurement outcomes: one row per shot, little-endian so column i is qubit i.
+    # Bob's bit is the per-qubit majority over the (odd number of) shots; with one shot it is that shot.
+    outcomes = pub_result.data.c.to_bool_array(order='little')
+    bob_measured_bits = (2 * np.count_nonzero(outcomes, axis=0) > len(outcomes)).astype(np.uint8)
+    
+    # Generate sifted keys by comparing bases (one mask shared by both keys).
+    mask = run['alice_bases'] == run['bob_bases']
+    alice_key = run['alice_bits'][mask]
+    bob_key = bob_measured_bits[mask]
+    
+    # Error rate between the sifted keys.
+    errors = int(np.count_nonzero(alice_key != bob_key))
+    qber = errors / alice_key.size if alice_key.size else 0.0
+    
+    return {
+        'alice_bits': run['alice_bits'],
+        'alice_bases': run['alice_bases'],
+        'bob_bases': run['bob_bases'],
         'bob_results': bob_measured_bits,
         'alice_key': alice_key,
         'bob_key': bob_key,
-        'job_id': job.job_id(),
-        'full_circuit': full_circuit
+        'qber': qber,
+        'keys_match': errors == 0,
+        'job_id': job_id,
+        'full_circuit': run['full_circuit']
     }
 
+# Prepare a run and submit its circuit without waiting for the result
+def submit_bb84(n_bits=4, seed=0, backend=None, shots=1):
+    run = prepare_bb84(n_bits, seed)
+    
+    if backend is None:
+        backend = get_backend()
+    
+    # Run circuit: hand-built in native gates on the best qubits when the backend
+    # allows, else bound into the template transpiled once for this backend and size
+    physical_qubits = select_isa_qubits(backend, n_bits)
+    if physical_qubits is not None:
+        transpiled_circuit = create_isa_circuit(run['alice_bits'], run['alice_bases'], run['bob_bases'],
+                                                physical_qubits, backend.target.num_qubits)
+    else:
+        transpiled_circuit = bind_transpiled_template(backend, run)
+    
+    # Each shot measures all qubits at once; more shots majority-vote away hardware noise.
+    job = get_sampler(backend).run([transpiled_circuit], shots=odd_shots(shots))
+    
+    return run, job
+
+def bb84_protocol(n_bits=4, seed=0, backend=None, shots=1):
+    run, job = submit_bb84(n_bits, seed, backend, shots)
+    result = job.result()
+    
+    return collect_bb84(run, result[0], job.job_id())
+
+# Several independent runs (one job per seed), all submitted before any result is
+# awaited so their queue and execution times overlap. Use with asyncio.run().
+async def bb84_gather(seeds, n_bits=4, backend=None, shots=1):
+    if backend is None:
+        backend = get_backend()
+    
+    submitted = [submit_bb84(n_bits, seed, backend, shots) for seed in seeds]
+    
+    # job.result() blocks, so each wait runs in the default thread pool.
+    loop = asyncio.get_running_loop()
+    results = await asyncio.gather(*(loop.run_in_executor(None, job.result) for _, job in submitted))
+    
+    return [collect_bb84(run, result[0], job.job_id()) for (run, job), result in zip(submitted, results)]
+
+# Several runs (one per seed) submitted as a single job inside one Batch
+def bb84_batch(seeds, n_bits=4, backend=None, shots=1):
+    runs = [prepare_bb84(n_bits, seed) for seed in seeds]
+    
+    if backend is None:
+        backend = get_backend()
+    
+    physical_qubits = select_isa_qubits(backend, n_bits)
+    if physical_qubits is not None:
+        transpiled_circuits = [create_isa_circuit(run['alice_bits'], run['alice_bases'], run['bob_bases'],
+                                                  physical_qubits, backend.target.num_qubits)
+                               for run in runs]
+    else:
+        transpiled_circuits = [bind_transpiled_template(backend, run) for run in runs]
+    
+    with Batch(backend=backend) as batch:
+        sampler = Sampler(mode=batch)
+        job = sampler.run(transpiled_circuits, shots=odd_shots(shots))
+        result = job.result()
+    
+    # One pub result per circuit, in submission order.
+    return [collect_bb84(run, pub_result, job.job_id()) for run, pub_result in zip(runs, result)]
+
 def analyze_results(results):
     print("Initial values:")
     print(f"Alice's bits: {results['alice_bits']}")
@@ -128,16 +266,13 @@ def analyze_results(results):
     print(f"Alice's key: {results['alice_key']}")
     print(f"Bob's key: {results['bob_key']}")
     
-    if results['alice_key'] == results['bob_key']:
+    if results['keys_match']:
         print("\nSuccess: Keys match!")
     else:
         print("\nWarning: Keys do not match")
-        for i, (a, b) in enumerate(zip(results['alice_key'], results['bob_key'])):
-            if a != b:
-                print(f"Position {i}: Alice has {a}, Bob has {b}")
-        errors = sum(a != b for a, b in zip(results['alice_key'], results['bob_key']))
-        qber = errors / len(results['alice_key']) if results['alice_key'] else 0
-        print(f"\nQuantum Bit Error Rate (QBER): {qber:.2%}")
+        for i in np.flatnonzero(results['alice_key'] != results['bob_key']):
+            print(f"Position {i}: Alice has {results['alice_key'][i]}, Bob has {results['bob_key'][i]}")
+        print(f"\nQuantum Bit Error Rate (QBER): {results['qber']:.2%}")
     
     print(f"\nJob ID: {results['job_id']}")
     print("\nFull Circuit Diagram:")